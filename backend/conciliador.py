@@ -1,17 +1,23 @@
 """
 Lógica principal de conciliación contable entre dos archivos de Excel.
 
-Lee Excel con openpyxl y compara por fecha y monto (sin pandas).
+Lee Excel con calamine (openpyxl como respaldo) y compara por fecha y monto (sin pandas).
 """
 
 from __future__ import annotations
 
-from collections import defaultdict
+import hashlib
+import math
+from collections import OrderedDict, defaultdict, deque
 from dataclasses import dataclass
+from datetime import datetime
 from io import BytesIO
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import chain, islice
+from threading import Lock
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 from openpyxl import load_workbook
+from python_calamine import CalamineError, CalamineWorkbook
 
 from .bancos_extractos import BANCOS_EXTRACTOS
 from .normalizador import normalizar_concepto, normalizar_fecha, normalizar_monto
@@ -26,47 +32,111 @@ class ColumnConfig:
     monto_debitos: Optional[str] = None
 
 
-def _inferir_columnas(columnas: List[str]) -> ColumnConfig:
-    cols_lower = {c.strip().lower() if c else "": c for c in columnas if c is not None}
-    cols_lower = {k: v for k, v in cols_lower.items() if k}
+# Clave de emparejamiento por (fecha, monto): int empaquetado o, para montos
+# fuera de rango, la tupla (día, centavos). Ver _clave_emparejamiento.
+ClaveEmparejamiento = Union[int, Tuple[int, int]]
 
-    def buscar(posibles: List[str]) -> str:
-        for candidato in posibles:
-            if candidato in cols_lower:
-                return cols_lower[candidato]
-        raise ValueError(
-            f"No se encontró ninguna de las columnas requeridas: {', '.join(posibles)}"
-        )
 
-    def buscar_opt(posibles: List[str]) -> Optional[str]:
-        for candidato in posibles:
-            if candidato in cols_lower:
-                return cols_lower[candidato]
-        return None
+@dataclass(slots=True)
+class Movimiento:
+    """
+    Fila preparada para conciliar. Con slots cada instancia ocupa bastante menos
+    que un dict y el acceso a atributos es más rápido que un lookup por clave.
+    """
 
-    fecha = buscar([
+    concepto: Any
+    fecha_norm: datetime
+    monto_norm: float
+    clave: ClaveEmparejamiento
+
+
+# Candidatos de encabezado por rol para la inferencia de columnas, en orden de prioridad.
+_COLUMNAS_INFERENCIA: Dict[str, List[str]] = {
+    "fecha": [
         "fecha", "fecha extracto", "fecha gasto", "fecha_contable", "fecha_acreditacion",
         "fecha_emision", "f_extracto", "f_gasto", "f_contable", "fecha ato", "fecha comp", "fecha valor",
-    ])
-    concepto = buscar([
+    ],
+    "concepto": [
         "concepto", "descripcion", "detalle", "movimiento",
         "concepto extracto", "concepto gasto", "concepto contable", "nombre_cuenta",
         "orden_pago", "nro_movimiento", "nro_deposito",
-    ])
-    creditos = buscar_opt(["creditos", "crédito", "credito"])
-    debitos = buscar_opt(["debitos", "débito", "debito"])
+    ],
+    "creditos": ["creditos", "crédito", "credito"],
+    "debitos": ["debitos", "débito", "debito"],
+    "monto": [
+        "monto", "importe", "valor", "monto extracto", "monto gasto", "monto contable",
+        "neto", "saldo", "importe_debe", "importe_haber",
+    ],
+}
+
+
+def _indexar_candidatos(
+    candidatos_por_rol: Dict[str, List[str]],
+) -> Dict[str, List[Tuple[str, int]]]:
+    """Invierte {rol: [candidatos]} en {candidato: [(rol, prioridad), ...]}."""
+    indice: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+    for rol, candidatos in candidatos_por_rol.items():
+        for prioridad, candidato in enumerate(candidatos):
+            indice[candidato].append((rol, prioridad))
+    return dict(indice)
+
+
+_INDICE_INFERENCIA = _indexar_candidatos(_COLUMNAS_INFERENCIA)
+
+
+def _resolver_roles(
+    columnas: List[str],
+    indice: Dict[str, List[Tuple[str, int]]],
+) -> Dict[str, str]:
+    """
+    Asigna columnas a roles en una sola pasada sobre los encabezados.
+    Para cada rol gana el candidato de mayor prioridad (primero en su lista);
+    ante encabezados repetidos gana el último, como con un dict por nombre.
+    """
+    elegidos: Dict[str, Tuple[int, str]] = {}
+    for columna in columnas:
+        if not columna:
+            continue
+        for rol, prioridad in indice.get(columna.strip().lower(), ()):
+            actual = elegidos.get(rol)
+            if actual is None or prioridad <= actual[0]:
+                elegidos[rol] = (prioridad, columna)
+    return {rol: columna for rol, (_, columna) in elegidos.items()}
+
+
+def _inferir_columnas(columnas: List[str]) -> ColumnConfig:
+    roles = _resolver_roles(columnas, _INDICE_INFERENCIA)
+
+    def buscar(rol: str) -> str:
+        if rol in roles:
+            return roles[rol]
+        raise ValueError(
+            "No se encontró ninguna de las columnas requeridas: "
+            f"{', '.join(_COLUMNAS_INFERENCIA[rol])}"
+        )
+
+    fecha = buscar("fecha")
+    concepto = buscar("concepto")
+    creditos = roles.get("creditos")
+    debitos = roles.get("debitos")
     if creditos is not None and debitos is not None:
         return ColumnConfig(
             fecha=fecha, concepto=concepto, monto=creditos,
             monto_creditos=creditos, monto_debitos=debitos,
         )
-    monto = buscar([
-        "monto", "importe", "valor", "monto extracto", "monto gasto", "monto contable",
-        "neto", "saldo", "importe_debe", "importe_haber",
-    ])
+    monto = buscar("monto")
     return ColumnConfig(fecha=fecha, concepto=concepto, monto=monto)
 
 
+_ROLES_BANCO = ("fecha", "concepto", "monto", "creditos", "debitos")
+
+# Índice de candidatos por banco, armado una vez al importar el módulo.
+_INDICE_POR_BANCO: Dict[str, Dict[str, List[Tuple[str, int]]]] = {
+    banco_id: _indexar_candidatos({rol: conf.get(rol, []) for rol in _ROLES_BANCO})
+    for banco_id, conf in BANCOS_EXTRACTOS.items()
+}
+
+
 def _column_config_para_banco(banco_id: str, columnas: List[str]) -> ColumnConfig:
     """
     Obtiene la ColumnConfig para un banco de extractos usando los nombres
@@ -75,137 +145,282 @@ def _column_config_para_banco(banco_id: str, columnas: List[str]) -> ColumnConfi
     if banco_id not in BANCOS_EXTRACTOS:
         raise ValueError(f"Banco desconocido: '{banco_id}'.")
     conf_banco = BANCOS_EXTRACTOS[banco_id]
-    cols_lower = {c.strip().lower() if c else "": c for c in columnas if c is not None}
-    cols_lower = {k: v for k, v in cols_lower.items() if k}
+    roles = _resolver_roles(columnas, _INDICE_POR_BANCO[banco_id])
 
-    def buscar(posibles: List[str]) -> str:
-        for candidato in posibles:
-            if candidato in cols_lower:
-                return cols_lower[candidato]
+    def buscar(rol: str) -> str:
+        if rol in roles:
+            return roles[rol]
         raise ValueError(
-            f"No se encontró ninguna de las columnas requeridas para este banco: {', '.join(posibles)}"
+            f"No se encontró ninguna de las columnas requeridas para este banco: {', '.join(conf_banco[rol])}"
         )
 
-    def buscar_opt(posibles: List[str]) -> Optional[str]:
-        for candidato in posibles:
-            if candidato in cols_lower:
-                return cols_lower[candidato]
-        return None
-
-    fecha = buscar(conf_banco["fecha"])
-    concepto = buscar(conf_banco["concepto"])
-    creditos = buscar_opt(conf_banco.get("creditos", []))
-    debitos = buscar_opt(conf_banco.get("debitos", []))
+    fecha = buscar("fecha")
+    concepto = buscar("concepto")
+    creditos = roles.get("creditos")
+    debitos = roles.get("debitos")
     if creditos is not None and debitos is not None:
         return ColumnConfig(
             fecha=fecha, concepto=concepto, monto=creditos,
             monto_creditos=creditos, monto_debitos=debitos,
         )
-    monto = buscar(conf_banco["monto"])
+    monto = buscar("monto")
     return ColumnConfig(fecha=fecha, concepto=concepto, monto=monto)
 
 
-def leer_excel_en_memoria(
-    file_bytes: bytes,
-    banco_extractos_id: Optional[str] = None,
-    sheet_index: Optional[int] = None,
-    max_rows: int = 200_000,
-) -> List[Dict[str, Any]]:
+def _validar_hoja(sheet_index: Optional[int], total_hojas: int) -> None:
+    if sheet_index is not None and (sheet_index < 1 or sheet_index > total_hojas):
+        raise ValueError("El número de hoja seleccionado no es válido para este archivo.")
+
+
+def _filas_hoja_calamine(archivo: BinaryIO, sheet_index: Optional[int]) -> Iterator[List[Any]]:
     """
-    Lee un archivo Excel desde bytes y devuelve una lista de diccionarios (una fila por dict).
-    Usa por defecto la primera hoja. Si se indica sheet_index (1-based), usa esa hoja.
-    Prueba varias filas como encabezado (0..11) para soportar informes con títulos.
-    Si banco_extractos_id está definido, usa la configuración de columnas de ese banco (solo para extractos).
-    Limita la cantidad de filas procesadas con max_rows para evitar consumir demasiada memoria.
+    Lee los valores de la hoja con calamine (parser nativo en Rust), mucho más
+    rápido que openpyxl. La apertura y la validación de la hoja se hacen acá,
+    así un CalamineError salta antes de iterar y se puede usar openpyxl.
     """
-    buffer = BytesIO(file_bytes)
-    ultimo_error: Exception | None = None
+    archivo.seek(0)
+    wb = CalamineWorkbook.from_filelike(archivo)
+    try:
+        _validar_hoja(sheet_index, len(wb.sheet_names))
+        indice = sheet_index - 1 if sheet_index is not None else 0
+        hoja = wb.get_sheet_by_index(indice)
+    except BaseException:
+        wb.close()
+        raise
+    return _iterar_filas_calamine(wb, hoja)
+
 
+def _iterar_filas_calamine(wb: CalamineWorkbook, hoja: Any) -> Iterator[List[Any]]:
+    """
+    Convierte las filas a objetos Python de a una con iter_rows, sin armar la
+    lista de listas de toda la hoja. El libro queda abierto hasta agotar el
+    generador (o hasta que se descarta).
+    """
+    # iter_rows omite las columnas vacías iniciales: se rellenan para que los
+    # índices de columna coincidan con el Excel (como to_python(skip_empty_area=False)).
+    relleno = [""] * hoja.start[1] if hoja.start else []
     try:
-        wb = load_workbook(buffer, read_only=True, data_only=True)
-    except Exception as exc:  # errores de formato/corrupción se manejan más arriba
-        raise exc
+        for fila in hoja.iter_rows():
+            # calamine devuelve todos los números como float; openpyxl devuelve int
+            # para los enteros, y así se siguen mostrando (p. ej. "123" y no "123.0").
+            yield relleno + [
+                int(v) if type(v) is float and v.is_integer() and abs(v) < 1e15 else v
+                for v in fila
+            ]
+    finally:
+        wb.close()
+
 
+def _filas_hoja_openpyxl(archivo: BinaryIO, sheet_index: Optional[int]) -> Iterator[Tuple[Any, ...]]:
+    """Lee los valores de la hoja con openpyxl, omitiendo filas ocultas si se conocen."""
+    # Errores de formato/corrupción se propagan y se manejan más arriba.
+    archivo.seek(0)
+    # read_only + data_only: sin objetos Cell con estilos ni fórmulas en memoria;
+    # keep_links=False evita cargar vínculos a libros externos que no se usan.
+    wb = load_workbook(archivo, read_only=True, data_only=True, keep_links=False)
     try:
-        if sheet_index is not None:
-            if sheet_index < 1 or sheet_index > len(wb.sheetnames):
-                raise ValueError(
-                    "El número de hoja seleccionado no es válido para este archivo."
-                )
-            ws = wb[wb.sheetnames[sheet_index - 1]]
-        else:
-            ws = wb.active
-
-        # Construimos una lista de filas visibles (no ocultas por filtros)
-        # y no completamente vacías. Esto respeta lo que ve el usuario en Excel.
-        rows: List[List[Any]] = []
-        visible_count = 0
-        # Usamos enumerate para obtener el índice de fila, evitando depender de cell.row,
-        # que no siempre existe en EmptyCell cuando read_only=True.
-        for row_index, row in enumerate(ws.iter_rows(), start=1):
-            if not row:
-                continue
+        _validar_hoja(sheet_index, len(wb.sheetnames))
+        # Sin sheet_index se usa la primera hoja (no la activa), igual que calamine.
+        indice = sheet_index - 1 if sheet_index is not None else 0
+        ws = wb[wb.sheetnames[indice]]
+
+        # Algunos generadores escriben una dimensión errónea (p. ej. "A1:A1" o
+        # ninguna) y en modo read_only openpyxl acota la lectura con ella,
+        # truncando datos. En esos casos se descarta y se lee la hoja completa.
+        if hasattr(ws, "reset_dimensions") and (
+            not ws.max_row or ws.max_row == 1 or not ws.max_column or ws.max_column == 1
+            or ws.max_row > 1_000_000
+        ):
+            ws.reset_dimensions()
+
+        # values_only=True devuelve tuplas de valores y evita instanciar un
+        # ReadOnlyCell por celda. El índice de fila sale de enumerate.
+        for row_index, values in enumerate(ws.iter_rows(values_only=True), start=1):
             # En modo read_only (ReadOnlyWorksheet) no siempre existe row_dimensions.
             if hasattr(ws, "row_dimensions"):
                 row_dim = ws.row_dimensions.get(row_index)
                 if row_dim is not None and getattr(row_dim, "hidden", False):
                     # Fila oculta por filtro u otra razón: se ignora
                     continue
+            yield values
+    finally:
+        wb.close()
 
-            values = [cell.value for cell in row]
-            if not any(v is not None and str(v).strip() for v in values):
-                # Fila completamente vacía o con solo blancos: ignorar
-                continue
-
-            rows.append(values)
-            visible_count += 1
-            if visible_count > max_rows:
-                raise ValueError(
-                    f"El archivo Excel tiene demasiadas filas visibles ({visible_count}). "
-                    f"Reducí el tamaño (máximo permitido: {max_rows})."
-                )
 
-        if not rows:
-            raise ValueError("El archivo Excel no contiene filas de datos visibles.")
+# Caché LRU de lecturas recientes: el usuario suele volver a subir el mismo archivo
+# mientras prueba hojas o modos. Se acota por cantidad total de filas cacheadas
+# (no por entradas): una fila pesa unos 460 bytes como dict, así que el tope
+# de 60.000 filas mantiene la caché por debajo de ~30 MB en Render (512 MB).
+# Las lecturas que por sí solas superan el tope no se cachean.
+_CACHE_LECTURAS_MAX_FILAS = 60_000
+_cache_lecturas: OrderedDict[Tuple[bytes, Optional[str], Optional[int], int], List[Dict[str, Any]]] = OrderedDict()
+_cache_lecturas_lock = Lock()
 
-        max_header_row = min(12, len(rows))
-        for header_row in range(max_header_row):
-            try:
-                if len(rows) <= header_row:
-                    continue
 
-                headers = [str(c).strip() if c is not None else "" for c in rows[header_row]]
-                config = (
-                    _column_config_para_banco(banco_extractos_id, headers)
-                    if banco_extractos_id
-                    else _inferir_columnas(headers)
-                )
-
-                data_rows = rows[header_row + 1 :]
-                out: List[Dict[str, Any]] = []
-                for row_values in data_rows:
-                    if not any(v is not None and str(v).strip() for v in row_values):
-                        continue
-                    fila = dict(zip(headers, row_values)) if row_values else {}
-                    out.append(fila)
-                if out:
-                    return out
-            except ValueError as e:
-                ultimo_error = e
-                continue
+def listar_hojas(archivo: Union[BinaryIO, bytes]) -> List[str]:
+    """
+    Devuelve los nombres de las hojas del Excel, en el mismo orden que usa
+    leer_excel_en_memoria para sheet_index. Usa calamine y openpyxl como respaldo.
+    """
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = BytesIO(archivo)
+    archivo.seek(0)
+    try:
+        wb = CalamineWorkbook.from_filelike(archivo)
+    except CalamineError:
+        archivo.seek(0)
+        wb_openpyxl = load_workbook(archivo, read_only=True, data_only=True, keep_links=False)
+        try:
+            return list(wb_openpyxl.sheetnames)
+        finally:
+            wb_openpyxl.close()
+    try:
+        return list(wb.sheet_names)
     finally:
         wb.close()
 
+
+def _hash_archivo(archivo: BinaryIO) -> bytes:
+    """Hash blake2b del contenido, leído por bloques para no copiarlo entero a memoria."""
+    h = hashlib.blake2b(digest_size=16)
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(1 << 20), b""):
+        h.update(bloque)
+    return h.digest()
+
+
+def leer_excel_en_memoria(
+    archivo: Union[BinaryIO, bytes],
+    banco_extractos_id: Optional[str] = None,
+    sheet_index: Optional[int] = None,
+    max_rows: int = 200_000,
+) -> List[Dict[str, Any]]:
+    """
+    Lee un archivo Excel y devuelve una lista de diccionarios (una fila por dict).
+    Acepta un archivo binario (p. ej. UploadFile.file, sin copiarlo a bytes) o bytes.
+    Usa por defecto la primera hoja. Si se indica sheet_index (1-based), usa esa hoja.
+    Prueba varias filas como encabezado (0..11) para soportar informes con títulos.
+    Si banco_extractos_id está definido, usa la configuración de columnas de ese banco (solo para extractos).
+    Limita la cantidad de filas procesadas con max_rows para evitar consumir demasiada memoria.
+    Lee con calamine y usa openpyxl como respaldo si calamine no puede abrir el archivo.
+
+    Las lecturas se cachean por contenido del archivo (hash blake2b) y parámetros;
+    los dicts devueltos se comparten entre llamadas y no deben modificarse.
+    """
+    if isinstance(archivo, (bytes, bytearray)):
+        archivo = BytesIO(archivo)
+    clave = (
+        _hash_archivo(archivo),
+        banco_extractos_id,
+        sheet_index,
+        max_rows,
+    )
+    with _cache_lecturas_lock:
+        filas = _cache_lecturas.get(clave)
+        if filas is not None:
+            _cache_lecturas.move_to_end(clave)
+            return list(filas)
+
+    filas = _leer_excel(archivo, banco_extractos_id, sheet_index, max_rows)
+
+    if len(filas) <= _CACHE_LECTURAS_MAX_FILAS:
+        with _cache_lecturas_lock:
+            _cache_lecturas[clave] = filas
+            _cache_lecturas.move_to_end(clave)
+            total = sum(len(v) for v in _cache_lecturas.values())
+            while total > _CACHE_LECTURAS_MAX_FILAS:
+                _, descartadas = _cache_lecturas.popitem(last=False)
+                total -= len(descartadas)
+    return list(filas)
+
+
+def _filas_no_vacias(filas_hoja: Iterable[Sequence[Any]], max_rows: int) -> Iterator[Sequence[Any]]:
+    """Filtra filas completamente vacías y corta si se supera max_rows."""
+    visible_count = 0
+    for values in filas_hoja:
+        if not values:
+            continue
+        if not any(v is not None and str(v).strip() for v in values):
+            # Fila completamente vacía o con solo blancos: ignorar
+            continue
+
+        visible_count += 1
+        if visible_count > max_rows:
+            raise ValueError(
+                f"El archivo Excel tiene demasiadas filas visibles ({visible_count}). "
+                f"Reducí el tamaño (máximo permitido: {max_rows})."
+            )
+        yield values
+
+
+def _leer_excel(
+    archivo: BinaryIO,
+    banco_extractos_id: Optional[str],
+    sheet_index: Optional[int],
+    max_rows: int,
+) -> List[Dict[str, Any]]:
+    ultimo_error: Exception | None = None
+
+    filas_hoja: Iterable[Sequence[Any]]
+    try:
+        filas_hoja = _filas_hoja_calamine(archivo, sheet_index)
+    except CalamineError:
+        filas_hoja = _filas_hoja_openpyxl(archivo, sheet_index)
+
+    # Solo se retienen las primeras 12 filas como candidatas a encabezado; el resto
+    # se consume en streaming directo a dicts, sin una lista intermedia de filas.
+    filas = _filas_no_vacias(filas_hoja, max_rows)
+    candidatas = list(islice(filas, 12))
+    if not candidatas:
+        raise ValueError("El archivo Excel no contiene filas de datos visibles.")
+
+    # Se elige la primera fila (0..11) cuyos encabezados resuelven las columnas
+    # requeridas y que tenga datos debajo.
+    for header_row, fila_encabezado in enumerate(candidatas):
+        headers = [str(c).strip() if c is not None else "" for c in fila_encabezado]
+        try:
+            if banco_extractos_id:
+                _column_config_para_banco(banco_extractos_id, headers)
+            else:
+                _inferir_columnas(headers)
+        except ValueError as e:
+            ultimo_error = e
+            continue
+        # Si la fila elegida es la última, no hay datos ni más candidatas.
+        out = [dict(zip(headers, values)) for values in chain(candidatas[header_row + 1 :], filas)]
+        if out:
+            return out
+
     raise ValueError(
         ultimo_error.args[0] if ultimo_error else "El archivo Excel no contiene filas de datos válidos."
     )
 
 
+# Los centavos ocupan los 48 bits bajos de la clave y el día los altos. Alcanza
+# para montos de hasta ±1,4 billones (2**47 centavos) sin colisiones; fuera de
+# ese rango la clave es la tupla (día, centavos).
+_BITS_CENTAVOS = 48
+_LIMITE_CENTAVOS = 1 << (_BITS_CENTAVOS - 1)
+
+
+def _clave_emparejamiento(fecha_norm: datetime, monto_norm: float) -> ClaveEmparejamiento:
+    """
+    Clave entera que empaqueta (ordinal del día, monto en centavos) para emparejar
+    movimientos. Comparar enteros evita la igualdad entre floats, y un solo int
+    se hashea más rápido que un datetime o una tupla. Los montos que no entran
+    en el empaquetado usan la tupla, que nunca es igual a un int.
+    """
+    centavos = round(monto_norm * 100)
+    if -_LIMITE_CENTAVOS < centavos < _LIMITE_CENTAVOS:
+        return (fecha_norm.toordinal() << _BITS_CENTAVOS) + centavos
+    return (fecha_norm.toordinal(), centavos)
+
+
 def _preparar_filas(
     filas: List[Dict[str, Any]],
     column_config: Optional[ColumnConfig] = None,
     banco_extractos_id: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+) -> List[Movimiento]:
     """Aplica normalizaciones y filtra filas inválidas. Si se pasa column_config o banco_extractos_id, se usa en lugar de inferir."""
     if not filas:
         return []
@@ -217,42 +432,57 @@ def _preparar_filas(
     else:
         config = _inferir_columnas(headers)
 
-    resultado = []
-    for idx, fila in enumerate(filas):
-        fecha_val = fila.get(config.fecha)
-        concepto_val = fila.get(config.concepto)
-        fecha_norm = normalizar_fecha(fecha_val)
-        concepto_norm = normalizar_concepto(concepto_val)
-        if config.monto_creditos is not None and config.monto_debitos is not None:
-            cr = normalizar_monto(fila.get(config.monto_creditos)) or 0.0
-            db = normalizar_monto(fila.get(config.monto_debitos)) or 0.0
-            monto_val = cr - db
-            monto_norm = round(monto_val, 2)
-        else:
-            monto_val = fila.get(config.monto)
-            monto_norm = normalizar_monto(monto_val)
+    # Las columnas y el modo de monto se resuelven una vez por archivo,
+    # no por fila: el bucle solo hace lookups y llamadas a los normalizadores.
+    col_fecha = config.fecha
+    col_concepto = config.concepto
+    col_monto = config.monto
+    col_creditos = config.monto_creditos
+    col_debitos = config.monto_debitos
+    usar_creditos_debitos = col_creditos is not None and col_debitos is not None
+
+    resultado: List[Movimiento] = []
+    for fila in filas:
+        # Se valida campo por campo y se descarta la fila apenas uno falla,
+        # sin normalizar el resto (empezando por la fecha, el filtro más selectivo
+        # en informes con títulos, subtotales y notas).
+        fecha_norm = normalizar_fecha(fila.get(col_fecha))
+        if fecha_norm is None:
+            continue
 
-        if fecha_norm is None or monto_norm is None:
+        if usar_creditos_debitos:
+            cr = normalizar_monto(fila.get(col_creditos)) or 0.0
+            db = normalizar_monto(fila.get(col_debitos)) or 0.0
+            monto_norm = round(cr - db, 2)
+        else:
+            monto_norm = normalizar_monto(fila.get(col_monto))
+            if monto_norm is None:
+                continue
+        # Textos como "nan", "inf" o "1e400" se normalizan a montos no finitos,
+        # que no tienen centavos para la clave de emparejamiento.
+        if not math.isfinite(monto_norm):
             continue
-        if not (concepto_norm or concepto_norm.strip()):
+
+        # normalizar_concepto ya devuelve el texto sin espacios en los extremos,
+        # así que alcanza con verificar que no esté vacío.
+        concepto_val = fila.get(col_concepto)
+        if not normalizar_concepto(concepto_val):
             continue
 
-        resultado.append({
-            "id": idx,
-            "fecha": fecha_val,
-            "concepto": concepto_val,
-            "monto": monto_val,
-            "fecha_norm": fecha_norm,
-            "concepto_norm": concepto_norm,
-            "monto_norm": monto_norm,
-        })
+        # Solo se conservan los campos que usan el emparejamiento y la salida.
+        resultado.append(Movimiento(
+            concepto=concepto_val,
+            fecha_norm=fecha_norm,
+            monto_norm=monto_norm,
+            clave=_clave_emparejamiento(fecha_norm, monto_norm),
+        ))
     return resultado
 
 
 def preparar_filas_extractos(
     filas: List[Dict[str, Any]],
     banco_extractos_id: Optional[str] = None,
-) -> List[Dict[str, Any]]:
+) -> List[Movimiento]:
     """
     Prepara filas de extractos (normaliza fecha, concepto, monto) para conciliación.
     Si banco_extractos_id es None, se infieren las columnas.
@@ -260,95 +490,106 @@ def preparar_filas_extractos(
     return _preparar_filas(filas, banco_extractos_id=banco_extractos_id)
 
 
-def comparar_movimientos(
-    extractos_filas: List[Dict[str, Any]],
-    contable_filas: List[Dict[str, Any]],
-    extractos_banco_id: Optional[str] = None,
-    extractos_preparados: Optional[List[Dict[str, Any]]] = None,
-) -> Dict[str, Any]:
+def _emparejar_por_fecha_y_monto(
+    extractos: List[Movimiento],
+    contable: List[Movimiento],
+) -> Tuple[bytearray, bytearray]:
     """
-    Compara movimientos por fecha y monto. Devuelve los que no tienen contraparte.
-    Si extractos_banco_id está definido, se usa la config de columnas de ese banco para los extractos.
-    Si extractos_preparados está definido, se usa esa lista en lugar de preparar extractos_filas
-    (útil cuando se combinan hoja de extracto + hoja de cheques diferidos).
-    """
-    if extractos_preparados is not None:
-        extractos = extractos_preparados
-    else:
-        extractos = _preparar_filas(extractos_filas, banco_extractos_id=extractos_banco_id)
-    contable = _preparar_filas(contable_filas)
+    Empareja 1 a 1 extractos y contable por fecha y monto (campo "clave").
 
-    # Índice (fecha_norm, monto_norm) -> lista de ids contable para emparejar 1 a 1.
-    # Así la búsqueda es O(1) por extracto en lugar de O(m), evitando timeout en Render.
-    contable_por_clave: Dict[Tuple[Any, Any], List[int]] = defaultdict(list)
-    for row in contable:
-        key = (row["fecha_norm"], row["monto_norm"])
-        contable_por_clave[key].append(row["id"])
+    Es un hash join: se indexa contable por clave una sola vez y cada extracto
+    consume un candidato del índice en O(1), en lugar de recorrer contable por
+    cada extracto (O(n·m)), lo que provocaba timeouts en Render.
+    Devuelve, por posición, qué filas de cada lado quedaron emparejadas (1) o no (0).
+    """
+    # Cada clave guarda una cola de posiciones: los movimientos repetidos se
+    # emparejan en orden de aparición (el primer extracto con el primer contable).
+    contable_por_clave: Dict[ClaveEmparejamiento, deque[int]] = defaultdict(deque)
+    for pos, row in enumerate(contable):
+        contable_por_clave[row.clave].append(pos)
+
+    # Máscaras por posición en lugar de sets de ids: marcar es una escritura
+    # en un bytearray y no hace falta hashear ids.
+    emparejado_extracto = bytearray(len(extractos))
+    emparejado_contable = bytearray(len(contable))
+
+    buscar_candidatos = contable_por_clave.get
+    for pos, ext in enumerate(extractos):
+        candidatos = buscar_candidatos(ext.clave)
+        if candidatos:
+            emparejado_extracto[pos] = 1
+            emparejado_contable[candidatos.popleft()] = 1
 
-    usados_extracto: set[int] = set()
-    usados_contable: set[int] = set()
+    return emparejado_extracto, emparejado_contable
 
-    for ext in extractos:
-        id_e = ext["id"]
-        if id_e in usados_extracto:
-            continue
-        key = (ext["fecha_norm"], ext["monto_norm"])
-        candidatos = contable_por_clave.get(key)
-        if candidatos:
-            cont_id = candidatos.pop()
-            usados_extracto.add(id_e)
-            usados_contable.add(cont_id)
 
-    solo_en_extractos: List[Dict[str, Any]] = []
-    solo_en_contable: List[Dict[str, Any]] = []
+def _filas_sin_pareja(filas: List[Movimiento], emparejados: bytearray) -> List[Dict[str, Any]]:
+    """Arma las filas de salida (fecha, monto, descripción) de los movimientos sin pareja."""
+    return [
+        {
+            "fecha": row.fecha_norm.strftime("%d/%m/%Y"),
+            "monto": float(row.monto_norm),
+            "descripcion": str(row.concepto) if row.concepto is not None else "",
+        }
+        for row, emparejado in zip(filas, emparejados)
+        if not emparejado
+    ]
 
-    for row in extractos:
-        if row["id"] in usados_extracto:
-            continue
-        fn = row["fecha_norm"]
-        fecha_str = fn.strftime("%d/%m/%Y") if fn else ""
-        solo_en_extractos.append({
-            "fecha": str(fecha_str),
-            "monto": float(row["monto_norm"]),
-            "descripcion": str(row["concepto"]) if row["concepto"] is not None else "",
-        })
-
-    for row in contable:
-        if row["id"] in usados_contable:
-            continue
-        fn = row["fecha_norm"]
-        fecha_str = fn.strftime("%d/%m/%Y") if fn else ""
-        solo_en_contable.append({
-            "fecha": str(fecha_str),
-            "monto": float(row["monto_norm"]),
-            "descripcion": str(row["concepto"]) if row["concepto"] is not None else "",
-        })
 
+def _resultado_comparacion(
+    extractos: List[Movimiento],
+    contable: List[Movimiento],
+) -> Dict[str, Any]:
+    """Empareja filas ya preparadas y arma la respuesta con las diferencias y el resumen."""
+    emparejado_extracto, emparejado_contable = _emparejar_por_fecha_y_monto(extractos, contable)
+    solo_en_extractos = _filas_sin_pareja(extractos, emparejado_extracto)
+    solo_en_contable = _filas_sin_pareja(contable, emparejado_contable)
     return {
         "solo_en_extractos": solo_en_extractos,
         "solo_en_contable": solo_en_contable,
         "resumen": {
             "total_extractos": len(extractos),
             "total_contable": len(contable),
-            "coincidencias": len(usados_extracto),
+            "coincidencias": emparejado_extracto.count(1),
             "diferentes_extractos": len(solo_en_extractos),
             "diferentes_contable": len(solo_en_contable),
         },
     }
 
 
-def _obtener_valor_por_indice(fila: Dict[str, Any], indice: int) -> Any:
+def comparar_movimientos(
+    extractos_filas: List[Dict[str, Any]],
+    contable_filas: List[Dict[str, Any]],
+    extractos_banco_id: Optional[str] = None,
+    extractos_preparados: Optional[List[Movimiento]] = None,
+) -> Dict[str, Any]:
     """
-    Devuelve el valor de una fila (dict) por índice de columna, respetando
-    el orden original de las columnas del Excel (orden de creación del dict).
-    Si el índice es inválido, devuelve None.
+    Compara movimientos por fecha y monto. Devuelve los que no tienen contraparte.
+    Si extractos_banco_id está definido, se usa la config de columnas de ese banco para los extractos.
+    Si extractos_preparados está definido, se usa esa lista en lugar de preparar extractos_filas
+    (útil cuando se combinan hoja de extracto + hoja de cheques diferidos).
     """
-    if indice < 0:
-        return None
-    try:
-        return list(fila.values())[indice]
-    except IndexError:
+    if extractos_preparados is not None:
+        extractos = extractos_preparados
+    else:
+        extractos = _preparar_filas(extractos_filas, banco_extractos_id=extractos_banco_id)
+    contable = _preparar_filas(contable_filas)
+
+    return _resultado_comparacion(extractos, contable)
+
+
+def _columna_por_indice(filas: List[Dict[str, Any]], indice: int) -> Optional[str]:
+    """
+    Devuelve el nombre de la columna ubicada en `indice`, respetando el orden
+    original de las columnas del Excel (orden de creación de los dicts).
+    Se resuelve una vez por archivo en lugar de reconstruir list(fila.values())
+    en cada fila. Si el índice es inválido, devuelve None.
+    """
+    if indice < 0 or not filas:
         return None
+    # Las filas más cortas tienen como claves un prefijo de las de la más larga.
+    columnas = list(max(filas, key=len).keys())
+    return columnas[indice] if indice < len(columnas) else None
 
 
 def comparar_por_columnas(
@@ -368,7 +609,7 @@ def comparar_por_columnas(
     - Concepto:
         * Extracto: columna "Movimiento"
         * Contable: columna "DETALLE"
-      Se usa solo para mostrar la descripción en la salida.
+      Se usa solo para mostrar la descripción en la salida (no se normaliza).
     - Monto: depende del modo de comparación (índices de columna, 0-based)
         * "extracto_D_vs_contable_I":
             - Extracto: columna D (índice 3)
@@ -376,7 +617,7 @@ def comparar_por_columnas(
         * "contable_H_vs_extracto_E":
             - Extracto: columna E (índice 4)
             - Contable: columna H (índice 7)
-      El emparejamiento se hace por (fecha_norm, monto_norm).
+      El emparejamiento se hace por fecha y monto (ver _clave_emparejamiento).
     """
     if modo_comparacion == "extracto_D_vs_contable_I":
         idx_monto_ext = 3  # Columna D
@@ -393,32 +634,30 @@ def comparar_por_columnas(
         fecha_col: str,
         concepto_col: str,
         idx_monto: int,
-    ) -> List[Dict[str, Any]]:
+    ) -> List[Movimiento]:
         if not filas:
             return []
-        resultado: List[Dict[str, Any]] = []
-        for idx, fila in enumerate(filas):
+        col_monto = _columna_por_indice(filas, idx_monto)
+        resultado: List[Movimiento] = []
+        for fila in filas:
             fecha_val = fila.get(fecha_col)
             fecha_norm = normalizar_fecha(fecha_val)
             if fecha_norm is None:
                 # Solo mostrar lo que tenga fecha
                 continue
+            # El concepto no participa del emparejamiento (solo se muestra),
+            # así que no se normaliza.
             concepto_val = fila.get(concepto_col)
-            concepto_norm = normalizar_concepto(concepto_val)
-            monto_val = _obtener_valor_por_indice(fila, idx_monto)
-            monto_norm = normalizar_monto(monto_val)
-            if monto_norm is None:
+            monto_norm = normalizar_monto(fila.get(col_monto) if col_monto is not None else None)
+            if monto_norm is None or not math.isfinite(monto_norm):
                 continue
             resultado.append(
-                {
-                    "id": idx,
-                    "fecha": fecha_val,
-                    "concepto": concepto_val,
-                    "monto": monto_val,
-                    "fecha_norm": fecha_norm,
-                    "concepto_norm": concepto_norm,
-                    "monto_norm": monto_norm,
-                }
+                Movimiento(
+                    concepto=concepto_val,
+                    fecha_norm=fecha_norm,
+                    monto_norm=monto_norm,
+                    clave=_clave_emparejamiento(fecha_norm, monto_norm),
+                )
             )
         return resultado
 
@@ -448,63 +687,4 @@ def comparar_por_columnas(
             },
         }
 
-    # Índice (fecha_norm, monto_norm) -> lista de ids contable para emparejar 1 a 1.
-    contable_por_clave: Dict[Tuple[Any, Any], List[int]] = defaultdict(list)
-    for row in contable:
-        key = (row["fecha_norm"], row["monto_norm"])
-        contable_por_clave[key].append(row["id"])
-
-    usados_extracto: set[int] = set()
-    usados_contable: set[int] = set()
-
-    for ext in extractos:
-        id_e = ext["id"]
-        if id_e in usados_extracto:
-            continue
-        key = (ext["fecha_norm"], ext["monto_norm"])
-        candidatos = contable_por_clave.get(key)
-        if candidatos:
-            cont_id = candidatos.pop()
-            usados_extracto.add(id_e)
-            usados_contable.add(cont_id)
-
-    solo_en_extractos: List[Dict[str, Any]] = []
-    solo_en_contable: List[Dict[str, Any]] = []
-
-    for row in extractos:
-        if row["id"] in usados_extracto:
-            continue
-        fn = row["fecha_norm"]
-        fecha_str = fn.strftime("%d/%m/%Y") if fn else ""
-        solo_en_extractos.append(
-            {
-                "fecha": str(fecha_str),
-                "monto": float(row["monto_norm"]),
-                "descripcion": str(row["concepto"]) if row["concepto"] is not None else "",
-            }
-        )
-
-    for row in contable:
-        if row["id"] in usados_contable:
-            continue
-        fn = row["fecha_norm"]
-        fecha_str = fn.strftime("%d/%m/%Y") if fn else ""
-        solo_en_contable.append(
-            {
-                "fecha": str(fecha_str),
-                "monto": float(row["monto_norm"]),
-                "descripcion": str(row["concepto"]) if row["concepto"] is not None else "",
-            }
-        )
-
-    return {
-        "solo_en_extractos": solo_en_extractos,
-        "solo_en_contable": solo_en_contable,
-        "resumen": {
-            "total_extractos": len(extractos),
-            "total_contable": len(contable),
-            "coincidencias": len(usados_extracto),
-            "diferentes_extractos": len(solo_en_extractos),
-            "diferentes_contable": len(solo_en_contable),
-        },
-    }
+    return _resultado_comparacion(extractos, contable)
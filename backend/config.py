@@ -19,3 +19,10 @@ FRONTEND_DIR: Path = BASE_DIR / "frontend"
 
 # Aseguramos que la carpeta de outputs exista al iniciar el módulo.
 OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Limpieza periódica de outputs/: los Excel generados más viejos que la
+# retención se borran cada cierto intervalo (ambos configurables por entorno).
+OUTPUTS_RETENCION_HORAS: float = float(os.environ.get("OUTPUTS_RETENCION_HORAS", "6"))
+OUTPUTS_LIMPIEZA_INTERVALO_MIN: float = float(
+    os.environ.get("OUTPUTS_LIMPIEZA_INTERVALO_MIN", "15")
+)
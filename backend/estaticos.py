@@ -0,0 +1,108 @@
+"""
+Servido de archivos estáticos del frontend.
+
+Los archivos chicos (index.html, script.js, styles.css, ...) se mantienen en
+memoria y se sirven sin abrir ni leer el disco en cada request; solo se hace
+un stat para detectar cambios. Los que superan el umbral se delegan en el
+StaticFiles estándar.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+from typing import Dict, NamedTuple, Optional
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+
+# Tamaño máximo (en bytes) de un archivo para mantenerlo en memoria.
+MAX_TAMANO_EN_MEMORIA = 256 * 1024
+
+
+class _Entrada(NamedTuple):
+    ruta: str
+    contenido: bytes
+    media_type: str
+    etag: str
+    mtime_ns: int
+    tamano: int
+
+
+def _cargar_entrada(ruta: str) -> Optional[_Entrada]:
+    """Lee el archivo y arma su entrada, o None si supera MAX_TAMANO_EN_MEMORIA."""
+    st = os.stat(ruta)
+    if st.st_size > MAX_TAMANO_EN_MEMORIA:
+        return None
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    media_type = mimetypes.guess_type(ruta)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type in (
+        "application/javascript",
+        "image/svg+xml",
+    ):
+        media_type += "; charset=utf-8"
+    etag = '"' + hashlib.blake2b(contenido, digest_size=8).hexdigest() + '"'
+    return _Entrada(ruta, contenido, media_type, etag, st.st_mtime_ns, st.st_size)
+
+
+class StaticFilesEnMemoria(StaticFiles):
+    """
+    StaticFiles con un manifiesto en memoria de los archivos chicos.
+
+    Cada request revalida la entrada con un stat (mtime y tamaño): si el
+    archivo cambió se vuelve a leer, así las ediciones del frontend se ven sin
+    reiniciar el servidor (uvicorn --reload solo vigila los .py).
+    """
+
+    def __init__(self, *, directory: str, html: bool = False, **kwargs) -> None:
+        super().__init__(directory=directory, html=html, **kwargs)
+        self._manifiesto = self._armar_manifiesto(directory)
+
+    @staticmethod
+    def _armar_manifiesto(directory: str) -> Dict[str, _Entrada]:
+        """Devuelve {ruta_relativa: entrada} con los archivos chicos del directorio."""
+        manifiesto: Dict[str, _Entrada] = {}
+        for raiz, _, archivos in os.walk(directory):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                entrada = _cargar_entrada(ruta)
+                if entrada is not None:
+                    relativa = os.path.normpath(os.path.relpath(ruta, directory))
+                    manifiesto[relativa] = entrada
+        return manifiesto
+
+    def _entrada_vigente(self, clave: str) -> Optional[_Entrada]:
+        entrada = self._manifiesto.get(clave)
+        if entrada is None:
+            return None
+        try:
+            st = os.stat(entrada.ruta)
+            if st.st_mtime_ns == entrada.mtime_ns and st.st_size == entrada.tamano:
+                return entrada
+            entrada = _cargar_entrada(entrada.ruta)
+        except FileNotFoundError:
+            entrada = None
+        if entrada is None:
+            # Borrado o demasiado grande ahora: lo resuelve StaticFiles.
+            self._manifiesto.pop(clave, None)
+        else:
+            self._manifiesto[clave] = entrada
+        return entrada
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] in ("GET", "HEAD"):
+            clave = "index.html" if self.html and path == "." else path
+            entrada = self._entrada_vigente(clave)
+            if entrada is not None:
+                headers = {"ETag": entrada.etag}
+                if_none_match = dict(scope["headers"]).get(b"if-none-match")
+                if if_none_match is not None and entrada.etag.encode() in (
+                    v.strip() for v in if_none_match.split(b",")
+                ):
+                    return Response(status_code=304, headers=headers)
+                return Response(entrada.contenido, media_type=entrada.media_type, headers=headers)
+        return await super().get_response(path, scope)
@@ -8,17 +8,25 @@ un Excel con las diferencias en outputs/.
 
 from __future__ import annotations
 
-from datetime import datetime
-from io import BytesIO
+import asyncio
+from contextlib import asynccontextmanager
 import logging
+import os
+from pathlib import Path
+import re
+import secrets
+from threading import Lock
 import time
+from typing import BinaryIO
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from openpyxl import Workbook, load_workbook
+from fastapi.responses import FileResponse, ORJSONResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from . import config
 from .bancos_extractos import BANCOS_EXTRACTOS, get_bancos_lista
@@ -26,22 +34,134 @@ from .conciliador import (
     comparar_movimientos,
     comparar_por_columnas,
     leer_excel_en_memoria,
+    listar_hojas,
     preparar_filas_extractos,
 )
+from .estaticos import StaticFilesEnMemoria
 from .schemas import ErrorResponse
 
 
 logger = logging.getLogger("conciliador")
 
 MAX_UPLOAD_SIZE_BYTES = 10 * 1024 * 1024  # 10 MB por archivo
+MAX_REQUEST_SIZE_BYTES = 50 * 1024 * 1024  # 50 MB por request (ambos archivos)
+
+# Estilos y encabezados del Excel de salida: se crean una vez, no por request.
+FONT_CUERPO = Font(name="Calibri", size=14)
+FONT_TITULO = Font(name="Calibri", size=14, bold=True)
+ENCABEZADOS_SALIDA = ("Fecha", "Monto", "Descripción")
+
+# Nombres que genera /conciliar (comparacion_<timestamp>[_<sufijo>].xlsx):
+# cualquier otra cosa se rechaza en /descargar sin tocar el disco.
+_NOMBRE_SALIDA_VALIDO = re.compile(r"comparacion_[0-9A-Za-z_]{1,40}\.xlsx")
+_OUTPUTS_DIR_REAL = config.OUTPUTS_DIR.resolve()
+
+# Nombres de Excel programados en segundo plano que todavía no terminaron de
+# escribirse. /descargar responde 202 para ellos (en lugar de 404).
+_excel_pendientes: set[str] = set()
+_excel_pendientes_lock = Lock()
+
+
+def _limpiar_outputs() -> int:
+    """
+    Borra de outputs/ los Excel (y temporales huérfanos) más viejos que la
+    retención configurada. Usa os.scandir para obtener nombre y stat en una
+    sola pasada. Devuelve la cantidad de archivos eliminados.
+    """
+    limite = time.time() - config.OUTPUTS_RETENCION_HORAS * 3600
+    eliminados = 0
+    with os.scandir(config.OUTPUTS_DIR) as entradas:
+        for entrada in entradas:
+            if not entrada.name.endswith((".xlsx", ".tmp")):
+                continue
+            try:
+                if entrada.is_file() and entrada.stat().st_mtime < limite:
+                    os.unlink(entrada.path)
+                    eliminados += 1
+            except FileNotFoundError:
+                continue
+    return eliminados
+
+
+async def _bucle_limpieza_outputs() -> None:
+    while True:
+        try:
+            eliminados = await asyncio.to_thread(_limpiar_outputs)
+            if eliminados:
+                logger.info("Limpieza de outputs: %d archivos eliminados", eliminados)
+        except Exception:
+            logger.exception("Error durante la limpieza de outputs")
+        await asyncio.sleep(config.OUTPUTS_LIMPIEZA_INTERVALO_MIN * 60)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    tarea = asyncio.create_task(_bucle_limpieza_outputs())
+    try:
+        yield
+    finally:
+        tarea.cancel()
 
 
 app = FastAPI(
     title="Conciliador Contable",
     description="API para conciliación contable basada en archivos Excel.",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+_DETALLE_413 = "Los archivos enviados superan el tamaño máximo permitido."
+
+
+class LimiteTamanoRequest:
+    """
+    Middleware ASGI que limita el tamaño del cuerpo del request a MAX_REQUEST_SIZE_BYTES.
+
+    - Con Content-Length mayor al máximo responde 413 sin leer el cuerpo.
+    - Sin Content-Length (p. ej. Transfer-Encoding: chunked) o si el cliente
+      envía más de lo declarado, cuenta los bytes a medida que se reciben y
+      corta con 413 apenas se pasa del máximo, antes de que Starlette termine
+      de volcar el multipart a disco.
+
+    Se registra antes que CORSMiddleware para quedar por dentro de él, así la
+    respuesta 413 también lleva los encabezados CORS.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit():
+            if int(content_length) > MAX_REQUEST_SIZE_BYTES:
+                respuesta = ORJSONResponse(status_code=413, content={"detail": _DETALLE_413})
+                await respuesta(scope, receive, send)
+                return
+
+        recibidos = 0
+
+        async def receive_limitado() -> Message:
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > MAX_REQUEST_SIZE_BYTES:
+                    # FastAPI propaga las HTTPException que surgen al leer el
+                    # cuerpo; la convierte en 413 el exception handler de abajo.
+                    raise HTTPException(status_code=413, detail=_DETALLE_413)
+            return mensaje
+
+        await self.app(scope, receive_limitado, send)
+
+
+# Starlette ejecuta primero el último middleware agregado: el límite de tamaño
+# se agrega antes que CORS para quedar por dentro.
+app.add_middleware(LimiteTamanoRequest)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -53,9 +173,78 @@ app.add_middleware(
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(_, exc: HTTPException):
-    return JSONResponse(
+    # Mismo formato que ErrorResponse (que queda como esquema de OpenAPI),
+    # sin instanciar el modelo en cada error.
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content=ErrorResponse(detail=str(exc.detail)).dict(),
+        content={"detail": str(exc.detail)},
+    )
+
+
+def _tamano_archivo(archivo: BinaryIO) -> int:
+    """Tamaño en bytes de un archivo binario, sin leer su contenido."""
+    tamano = archivo.seek(0, os.SEEK_END)
+    archivo.seek(0)
+    return tamano
+
+
+def _escribir_hoja(wb: Workbook, titulo: str, filas: list[dict]) -> None:
+    # Modo write-only: las filas se escriben directo al XML sin retener
+    # objetos Cell, y los estilos se aplican al crear cada celda en lugar
+    # de recorrer la hoja otra vez. Los anchos deben fijarse antes del
+    # primer append, así que se calculan sobre los datos.
+    ws = wb.create_sheet(titulo)
+    anchos = [len(h) for h in ENCABEZADOS_SALIDA]
+    valores = []
+    for r in filas:
+        fila = (r["fecha"], r["monto"], r["descripcion"])
+        for i, v in enumerate(fila):
+            largo = len(str(v)) if v else 0
+            if largo > anchos[i]:
+                anchos[i] = largo
+        valores.append(fila)
+    for letra, ancho in zip("ABC", anchos):
+        ws.column_dimensions[letra].width = min(ancho + 1, 80)
+
+    def celda(valor, font):
+        c = WriteOnlyCell(ws, value=valor)
+        c.font = font
+        return c
+
+    ws.append([celda(h, FONT_TITULO) for h in ENCABEZADOS_SALIDA])
+    for fila in valores:
+        ws.append([celda(v, FONT_CUERPO) for v in fila])
+
+
+def _escribir_excel_resultado(resultado: dict, output_path: Path) -> None:
+    """
+    Genera el Excel con las diferencias (una hoja por lado) en output_path.
+    Corre como tarea en segundo plano, después de enviar la respuesta: se
+    escribe a un archivo temporal y se renombra al final, así /descargar
+    nunca sirve un Excel a medio escribir.
+    """
+    t0 = time.perf_counter()
+    tmp_path = output_path.with_suffix(".tmp")
+    try:
+        wb = Workbook(write_only=True)
+        _escribir_hoja(wb, "Solo en extractos", resultado["solo_en_extractos"])
+        _escribir_hoja(wb, "Solo en contable", resultado["solo_en_contable"])
+        # Se guarda directo al archivo: el ZIP se escribe en streaming al disco
+        # sin armar antes una copia completa en memoria.
+        wb.save(tmp_path)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        logger.exception("Error al generar el Excel de salida %s", output_path.name)
+        tmp_path.unlink(missing_ok=True)
+        return
+    finally:
+        # Se quita de pendientes después del os.replace: si el nombre ya no
+        # está pendiente, el archivo existe (o la generación falló).
+        with _excel_pendientes_lock:
+            _excel_pendientes.discard(output_path.name)
+    logger.info(
+        "Generación de Excel de salida completada en %.3f s",
+        time.perf_counter() - t0,
     )
 
 
@@ -68,6 +257,7 @@ async def http_exception_handler(_, exc: HTTPException):
     },
 )
 def conciliar_endpoint(
+    background_tasks: BackgroundTasks,
     extractos_file: UploadFile = File(..., description="Archivo Excel con los extractos."),
     contable_file: UploadFile = File(..., description="Archivo Excel con el registro contable."),
     banco_extractos: str = Form(..., description="Banco del extracto (santander o provincia)."),
@@ -116,26 +306,27 @@ def conciliar_endpoint(
         )
 
     try:
-        # Lectura de archivos en memoria (lado síncrono: este endpoint corre en threadpool)
-        extractos_bytes = extractos_file.file.read()
-        contable_bytes = contable_file.file.read()
+        # Los archivos se leen directo del SpooledTemporaryFile del upload, sin
+        # copiarlos a bytes (lado síncrono: este endpoint corre en threadpool).
+        extractos_size = _tamano_archivo(extractos_file.file)
+        contable_size = _tamano_archivo(contable_file.file)
 
-        if not extractos_bytes:
+        if not extractos_size:
             raise HTTPException(status_code=400, detail="El archivo de extractos está vacío.")
-        if not contable_bytes:
+        if not contable_size:
             raise HTTPException(status_code=400, detail="El archivo contable está vacío.")
 
         logger.info(
             "Archivos recibidos: extractos=%d bytes, contable=%d bytes",
-            len(extractos_bytes),
-            len(contable_bytes),
+            extractos_size,
+            contable_size,
         )
 
         try:
             t0 = time.perf_counter()
             # Hoja principal de extractos (siempre obligatoria)
             extractos_principal = leer_excel_en_memoria(
-                extractos_bytes,
+                extractos_file.file,
                 banco_extractos_id=banco_extractos,
                 sheet_index=extractos_hoja_index,
             )
@@ -151,7 +342,7 @@ def conciliar_endpoint(
             if cheques_diferidos_hoja_index is not None:
                 t1 = time.perf_counter()
                 extractos_cheques = leer_excel_en_memoria(
-                    extractos_bytes,
+                    extractos_file.file,
                     banco_extractos_id=None,
                     sheet_index=cheques_diferidos_hoja_index,
                 )
@@ -167,15 +358,13 @@ def conciliar_endpoint(
                     extractos_cheques, banco_extractos_id=None
                 )
                 extractos_combinados = prep_principal + prep_cheques
-                for i, row in enumerate(extractos_combinados):
-                    row["id"] = i
                 extractos_filas = None
             else:
                 extractos_filas = extractos_principal
 
             t2 = time.perf_counter()
             contable_filas = leer_excel_en_memoria(
-                contable_bytes,
+                contable_file.file,
                 banco_extractos_id=None,
                 sheet_index=contable_hoja_index,
             )
@@ -222,52 +411,26 @@ def conciliar_endpoint(
             "Comparación de movimientos completada en %.3f s", time.perf_counter() - t3
         )
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"comparacion_{timestamp}.xlsx"
-        output_path = config.OUTPUTS_DIR / filename
-
-        font_cuerpo = Font(name="Calibri", size=14)
-        font_titulo = Font(name="Calibri", size=14, bold=True)
-
-        def formatear_hoja(ws):
-            for row in ws.iter_rows():
-                for cell in row:
-                    cell.font = font_cuerpo
-            for cell in ws[1]:
-                cell.font = font_titulo
-            for col in ws.columns:
-                max_len = max((len(str(c.value or "")) for c in col), default=0)
-                if col:
-                    ws.column_dimensions[col[0].column_letter].width = min(max_len + 1, 80)
-
-        t4 = time.perf_counter()
-        wb = Workbook()
-        ws1 = wb.active
-        ws1.title = "Solo en extractos"
-        ws1.append(["Fecha", "Monto", "Descripción"])
-        for r in resultado["solo_en_extractos"]:
-            ws1.append([r["fecha"], r["monto"], r["descripcion"]])
-        formatear_hoja(ws1)
-
-        ws2 = wb.create_sheet("Solo en contable")
-        ws2.append(["Fecha", "Monto", "Descripción"])
-        for r in resultado["solo_en_contable"]:
-            ws2.append([r["fecha"], r["monto"], r["descripcion"]])
-        formatear_hoja(ws2)
-
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        output_path.write_bytes(buffer.read())
-        logger.info(
-            "Generación de Excel de salida completada en %.3f s",
-            time.perf_counter() - t4,
-        )
+        if resultado["solo_en_extractos"] or resultado["solo_en_contable"]:
+            # El sufijo aleatorio evita que dos requests del mismo segundo
+            # compartan (y se pisen) el archivo de salida.
+            filename = f"comparacion_{int(time.time())}_{secrets.token_hex(3)}.xlsx"
+            output_path = config.OUTPUTS_DIR / filename
+            # El Excel se genera después de responder; mientras tanto /descargar
+            # devuelve 202 y el frontend vuelve a consultar.
+            with _excel_pendientes_lock:
+                _excel_pendientes.add(filename)
+            background_tasks.add_task(_escribir_excel_resultado, resultado, output_path)
+        else:
+            # Conciliación limpia: no hay diferencias que exportar.
+            filename = None
 
         resultado["excel_filename"] = filename
         resultado["modo_comparacion"] = modo_comparacion
         logger.info("Conciliación finalizada en %.3f s", time.perf_counter() - inicio_total)
-        return resultado
+        # El resultado ya tiene solo tipos nativos: se serializa directo con
+        # orjson, sin pasar por jsonable_encoder.
+        return ORJSONResponse(resultado)
 
     except HTTPException:
         # Ya encapsula un mensaje claro para el frontend; solo lo registramos.
@@ -284,22 +447,40 @@ def conciliar_endpoint(
 
 @app.get("/descargar/{filename}")
 async def descargar_excel(filename: str):
-    if not filename.endswith(".xlsx") or ".." in filename or "/" in filename:
+    if not _NOMBRE_SALIDA_VALIDO.fullmatch(filename):
         raise HTTPException(status_code=400, detail="Nombre de archivo no válido.")
-    path = config.OUTPUTS_DIR / filename
-    if not path.exists():
+    # Si outputs/ contiene un symlink hacia afuera, la ruta real lo delata.
+    path = (config.OUTPUTS_DIR / filename).resolve()
+    if path.parent != _OUTPUTS_DIR_REAL:
+        raise HTTPException(status_code=400, detail="Nombre de archivo no válido.")
+    if filename in _excel_pendientes:
+        return ORJSONResponse(
+            status_code=202,
+            content={"detail": "El archivo todavía se está generando."},
+            headers={"Retry-After": "1"},
+        )
+    try:
+        # Un único stat: sirve de chequeo de existencia y se reusa en la respuesta.
+        st = path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="El archivo no existe o ya fue eliminado.")
     return FileResponse(
         path=str(path),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         filename=filename,
+        stat_result=st,
+        headers={"Cache-Control": "private, max-age=3600"},
     )
 
 
+# BANCOS_EXTRACTOS es estático: la respuesta de /bancos se arma una sola vez.
+_RESPUESTA_BANCOS = {"bancos": get_bancos_lista()}
+
+
 @app.get("/bancos")
 async def listar_bancos():
     """Devuelve la lista de bancos disponibles para el archivo de extractos."""
-    return {"bancos": get_bancos_lista()}
+    return _RESPUESTA_BANCOS
 
 
 @app.post(
@@ -328,10 +509,7 @@ async def info_extracto(
         )
 
     try:
-        buffer = BytesIO(contenido)
-        wb = load_workbook(buffer, read_only=True, data_only=True)
-        nombres = list(wb.sheetnames)
-        wb.close()
+        nombres = listar_hojas(contenido)
     except Exception:
         raise HTTPException(
             status_code=400,
@@ -366,10 +544,7 @@ async def info_contable(
         raise HTTPException(status_code=400, detail="El archivo contable está vacío.")
 
     try:
-        buffer = BytesIO(contenido)
-        wb = load_workbook(buffer, read_only=True, data_only=True)
-        nombres = list(wb.sheetnames)
-        wb.close()
+        nombres = listar_hojas(contenido)
     except Exception:
         raise HTTPException(
             status_code=400,
@@ -392,7 +567,11 @@ async def health_check():
 
 # Sirve el frontend estático (para despliegue en Render; en local opcional).
 if config.FRONTEND_DIR.exists():
-    app.mount("/", StaticFiles(directory=str(config.FRONTEND_DIR), html=True), name="frontend")
+    app.mount(
+        "/",
+        StaticFilesEnMemoria(directory=str(config.FRONTEND_DIR), html=True),
+        name="frontend",
+    )
 
 
 if __name__ == "__main__":
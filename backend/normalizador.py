@@ -8,23 +8,82 @@ from __future__ import annotations
 
 import re
 import unicodedata
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 from typing import Any, Optional
 
 
+# Los archivos repiten mucho los mismos valores (conceptos, fechas, importes
+# como texto): las conversiones desde cadena se memorizan con este tamaño.
+_TAMANO_CACHE = 65536
+
+
 def _is_na(valor: Any) -> bool:
-    if valor is None:
-        return True
-    if isinstance(valor, float) and valor != valor:  # NaN
-        return True
-    return False
+    # Solo NaN es distinto de sí mismo: el isinstance se evalúa únicamente en
+    # ese caso (raro) para no tratar como NA un Decimal("NaN") u otro tipo.
+    return valor is None or (valor != valor and isinstance(valor, float))
+
+
+# Formatos habituales (día primero para uso hispano). Se define una sola vez
+# a nivel módulo en lugar de reconstruir la lista en cada llamada.
+_FORMATOS_FECHA = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%Y-%m-%d", "%Y/%m/%d",
+    "%d/%m/%y", "%d-%m-%y",
+)
+
+# Tres grupos de dígitos con el mismo separador en ambas posiciones.
+_RE_FECHA_NUMERICA = re.compile(r"([0-9]{1,4})([/.\-])([0-9]{1,2})\2([0-9]{1,4})")
+
+
+def _fecha_dmy(dia: str, mes: str, anio: str) -> datetime:
+    return datetime(int(anio), int(mes), int(dia))
+
+
+def _fecha_ymd(anio: str, mes: str, dia: str) -> datetime:
+    return datetime(int(anio), int(mes), int(dia))
+
+
+def _fecha_dmy_corta(dia: str, mes: str, anio: str) -> datetime:
+    # Mismo pivote que %y de strptime: 69-99 -> 1900, 00-68 -> 2000.
+    a = int(anio)
+    return datetime(a + (1900 if a >= 69 else 2000), int(mes), int(dia))
+
+
+# Tabla (separador, dígitos del primer grupo, dígitos del último grupo) ->
+# constructor. Reproduce exactamente los formatos de _FORMATOS_FECHA.
+_DESPACHO_FECHA = {}
+for _n in (1, 2):
+    for _sep in "/-.":
+        _DESPACHO_FECHA[(_sep, _n, 4)] = _fecha_dmy  # %d/%m/%Y, %d-%m-%Y, %d.%m.%Y
+    for _sep in "-/":
+        _DESPACHO_FECHA[(_sep, 4, _n)] = _fecha_ymd  # %Y-%m-%d, %Y/%m/%d
+    for _sep in "/-":
+        _DESPACHO_FECHA[(_sep, _n, 2)] = _fecha_dmy_corta  # %d/%m/%y, %d-%m-%y
+del _n, _sep
+
+
+def _precalentar_strptime() -> None:
+    """
+    La primera llamada a strptime importa _strptime y arma, bajo un lock
+    global, las expresiones dependientes del locale. Se hace acá, al importar,
+    para que no la pague (ni la serialice) el primer request en el threadpool.
+    """
+    for fmt in _FORMATOS_FECHA:
+        try:
+            datetime.strptime("", fmt)
+        except ValueError:
+            pass
+
+
+_precalentar_strptime()
 
 
 def normalizar_fecha(valor: Any) -> Optional[datetime]:
     """
     Normaliza una fecha a datetime (solo fecha, hora a 00:00:00).
 
-    - Acepta objetos datetime o cadenas.
+    - Acepta objetos datetime, date o cadenas.
     - Para cadenas intenta varios formatos comunes (día/mes/año, etc.).
     - Devuelve None si no es posible interpretar la fecha.
     """
@@ -34,17 +93,33 @@ def normalizar_fecha(valor: Any) -> Optional[datetime]:
     if isinstance(valor, datetime):
         return valor.replace(hour=0, minute=0, second=0, microsecond=0)
 
+    # calamine devuelve las celdas de solo fecha como date: se convierten
+    # directo en lugar de pasar por str() + strptime.
+    if isinstance(valor, date):
+        return datetime(valor.year, valor.month, valor.day)
+
     texto = str(valor).strip()
     if not texto:
         return None
+    return _fecha_desde_texto(texto)
+
+
+@lru_cache(maxsize=_TAMANO_CACHE)
+def _fecha_desde_texto(texto: str) -> Optional[datetime]:
+    # Camino rápido: separador y largo de los grupos eligen el formato en la
+    # tabla, sin recorrer los formatos con strptime y sus ValueError.
+    m = _RE_FECHA_NUMERICA.fullmatch(texto)
+    if m is not None:
+        constructor = _DESPACHO_FECHA.get((m[2], len(m[1]), len(m[4])))
+        if constructor is None:
+            return None
+        try:
+            return constructor(m[1], m[3], m[4])
+        except ValueError:
+            return None
 
-    # Formatos habituales (día primero para uso hispano)
-    formatos = [
-        "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y",
-        "%Y-%m-%d", "%Y/%m/%d",
-        "%d/%m/%y", "%d-%m-%y",
-    ]
-    for fmt in formatos:
+    # Casos poco comunes (p. ej. "1/ 2/2024", que strptime acepta).
+    for fmt in _FORMATOS_FECHA:
         try:
             return datetime.strptime(texto, fmt).replace(hour=0, minute=0, second=0, microsecond=0)
         except ValueError:
@@ -52,9 +127,35 @@ def normalizar_fecha(valor: Any) -> Optional[datetime]:
     return None
 
 
+# Patrones de normalizar_concepto, compilados una sola vez al importar.
+# Cada tramo de caracteres no permitidos y/o espacios se reemplaza por un
+# único espacio: equivale a sustituir los no permitidos y luego colapsar \s+.
+_RE_NO_PERMITIDOS = re.compile(r"[^A-Z0-9_.\-]+")
+_RE_CONCEPTO_CANONICO = re.compile(r"[A-Z0-9_.\-]+(?: [A-Z0-9_.\-]+)*")
+
+
+class _TablaSinCombinantes(dict):
+    """
+    Tabla para str.translate que elimina los caracteres combinantes (tildes,
+    diéresis, etc.). Se completa a demanda: cada code point se clasifica una
+    sola vez con unicodedata.combining y queda memorizado.
+    """
+
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        destino = None if unicodedata.combining(chr(codepoint)) else codepoint
+        self[codepoint] = destino
+        return destino
+
+
+_SIN_COMBINANTES = _TablaSinCombinantes()
+
+
 def _quitar_tildes(texto: str) -> str:
-    nfkd = unicodedata.normalize("NFKD", texto)
-    return "".join(c for c in nfkd if not unicodedata.combining(c))
+    # La mayoría de los conceptos bancarios ya son ASCII: NFKD no los cambia
+    # y no tienen combinantes, así que se devuelven tal cual.
+    if texto.isascii():
+        return texto
+    return unicodedata.normalize("NFKD", texto).translate(_SIN_COMBINANTES)
 
 
 def normalizar_concepto(valor: Any) -> str:
@@ -63,12 +164,20 @@ def normalizar_concepto(valor: Any) -> str:
     """
     if _is_na(valor):
         return ""
-
-    texto = str(valor).strip().upper()
+    return _concepto_desde_texto(str(valor))
+
+
+@lru_cache(maxsize=_TAMANO_CACHE)
+def _concepto_desde_texto(texto: str) -> str:
+    # Sin strip previo: los espacios de los extremos terminan colapsados por
+    # _RE_NO_PERMITIDOS y los quita el strip final.
+    texto = texto.upper()
+    # Conceptos ya canónicos (solo caracteres permitidos y espacios simples)
+    # se devuelven sin pasar por NFKD ni por las sustituciones.
+    if _RE_CONCEPTO_CANONICO.fullmatch(texto):
+        return texto
     texto = _quitar_tildes(texto)
-    texto = re.sub(r"[^A-Z0-9\s\-\_\.]", " ", texto)
-    texto = re.sub(r"\s+", " ", texto)
-    return texto.strip()
+    return _RE_NO_PERMITIDOS.sub(" ", texto).strip()
 
 
 def normalizar_monto(valor: Any) -> Optional[float]:
@@ -78,19 +187,38 @@ def normalizar_monto(valor: Any) -> Optional[float]:
     if _is_na(valor):
         return None
 
-    if isinstance(valor, (int, float)) and not (isinstance(valor, float) and valor != valor):
+    # Caso más común (celdas numéricas): comparar el tipo exacto es más barato
+    # que isinstance con tupla. El NaN ya lo descartó _is_na.
+    t = type(valor)
+    if t is float:
+        return round(abs(valor), 2)
+    if t is int or isinstance(valor, (int, float)):  # incluye bool y subclases
         return round(abs(float(valor)), 2)
 
-    texto = str(valor).strip().replace(" ", "")
-    if not texto:
-        return None
+    # El strip se hace dentro de la función cacheada: solo se paga en los
+    # valores nuevos. Una cadena vacía termina en ValueError -> None.
+    return _monto_desde_texto(str(valor))
+
+
+# Tablas de normalizar_monto: con coma, la coma es el decimal y el punto es
+# separador de miles; sin coma, solo se quitan los espacios.
+_MONTO_COMA_DECIMAL = str.maketrans({" ": None, ".": None, ",": "."})
+_MONTO_SIN_ESPACIOS = str.maketrans({" ": None})
 
-    if "," in texto and "." in texto:
-        texto = texto.replace(".", "").replace(",", ".")
-    elif "," in texto:
-        texto = texto.replace(",", ".")
 
+@lru_cache(maxsize=_TAMANO_CACHE)
+def _monto_desde_texto(texto: str) -> Optional[float]:
+    # Una sola pasada en C en lugar de la cadena de replace().
+    texto = texto.strip()
+    texto = texto.translate(_MONTO_COMA_DECIMAL if "," in texto else _MONTO_SIN_ESPACIOS)
     try:
         return round(abs(float(texto)), 2)
     except ValueError:
         return None
+
+
+def limpiar_caches() -> None:
+    """Vacía las cachés de normalización (por ejemplo, entre archivos grandes)."""
+    _fecha_desde_texto.cache_clear()
+    _concepto_desde_texto.cache_clear()
+    _monto_desde_texto.cache_clear()
@@ -5,12 +5,14 @@ Se definen principalmente para respuestas de error y metadatos
 que pueda necesitar el frontend.
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class ErrorResponse(BaseModel):
     """Esquema genérico para devolver errores en formato JSON."""
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     detail: str
 
 
@@ -19,5 +21,7 @@ class ConciliacionMeta(BaseModel):
     Información básica sobre un archivo de conciliación generado.
     """
 
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
     filename: str
     url: str
@@ -39,6 +39,8 @@ let totalHojasContable = null;
 let nombresHojasContable = [];
 
 const TEMA_KEY = "conciliador-tema";
+// Tiempo máximo esperando a que el backend termine de generar el Excel (202).
+const ESPERA_MAXIMA_EXCEL_MS = 5 * 60 * 1000;
 
 // Cargar lista de bancos para el selector de extractos
 async function cargarBancos() {
@@ -410,7 +412,27 @@ function mostrarResultado(data) {
 async function descargarExcel() {
   if (!ultimoExcelFilename) return;
   try {
-    const response = await fetch(`${API_BASE_URL}/descargar/${ultimoExcelFilename}`);
+    // El backend genera el Excel después de responder: mientras se está
+    // escribiendo devuelve 202, así que se vuelve a consultar hasta que esté.
+    const urlDescarga = `${API_BASE_URL}/descargar/${ultimoExcelFilename}`;
+    const limite = Date.now() + ESPERA_MAXIMA_EXCEL_MS;
+    let response = await fetch(urlDescarga);
+    let espera = 300;
+    if (response.status === 202) {
+      agregarMensaje("Generando el Excel, por favor espere...", "info");
+    }
+    while (response.status === 202) {
+      if (Date.now() + espera > limite) {
+        agregarMensaje(
+          "El Excel está tardando demasiado en generarse. Volvé a comparar los archivos e intentá de nuevo.",
+          "error"
+        );
+        return;
+      }
+      await new Promise((resolve) => setTimeout(resolve, espera));
+      espera = Math.min(espera * 2, 2000);
+      response = await fetch(urlDescarga);
+    }
     if (!response.ok) throw new Error("No se pudo descargar el archivo");
     const blob = await response.blob();
     const url = URL.createObjectURL(blob);
@@ -494,7 +516,12 @@ form.addEventListener("submit", async (event) => {
 
     const data = await response.json();
     limpiarMensajes();
-    agregarMensaje("Comparación completada. Puede descargar el Excel con el resultado.", "success");
+    agregarMensaje(
+      data.excel_filename
+        ? "Comparación completada. Puede descargar el Excel con el resultado."
+        : "Comparación completada. No se encontraron diferencias.",
+      "success"
+    );
     mostrarResultado(data);
   } catch (error) {
     console.error(error);
@@ -1,14 +1,39 @@
 """
 Script para comprobar si el backend está corriendo.
 Ejecutar (con o sin venv activado): python verificar_backend.py
+
+Por defecto solo prueba que el puerto acepte conexiones (TCP).
+Con --full además consulta /health y valida la respuesta JSON.
 """
+import socket
+import sys
 import urllib.request
 import urllib.error
 import json
 
-URL = "http://127.0.0.1:8000/health"
+HOST = "127.0.0.1"
+PORT = 8000
+URL = f"http://{HOST}:{PORT}/health"
+
+def imprimir_no_corre():
+    print("ERROR - El backend NO esta corriendo. Inicialo con:")
+    print("  venv\\Scripts\\activate.bat")
+    print("  python -m uvicorn backend.main:app --port 8000")
 
-def main():
+def verificar_puerto():
+    try:
+        with socket.create_connection((HOST, PORT), timeout=0.5):
+            pass
+    except ConnectionRefusedError:
+        imprimir_no_corre()
+        return 1
+    except OSError as e:
+        print("ERROR - No se pudo conectar:", e)
+        return 1
+    print("OK - El backend esta corriendo en http://localhost:8000")
+    return 0
+
+def verificar_health():
     try:
         req = urllib.request.Request(URL)
         with urllib.request.urlopen(req, timeout=3) as resp:
@@ -21,9 +46,7 @@ def main():
     except urllib.error.URLError as e:
         err = str(e.reason).lower()
         if "refused" in err or "deneg" in err or "10061" in err or "no connection" in err:
-            print("ERROR - El backend NO esta corriendo. Inicialo con:")
-            print("  venv\\Scripts\\activate.bat")
-            print("  python -m uvicorn backend.main:app --port 8000")
+            imprimir_no_corre()
         else:
             print("ERROR - No se pudo conectar:", e.reason)
         return 1
@@ -31,5 +54,11 @@ def main():
         print("ERROR -", e)
         return 1
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if "--full" in argv:
+        return verificar_health()
+    return verificar_puerto()
+
 if __name__ == "__main__":
     exit(main())